@@ -1,13 +1,21 @@
 import os
+import base64
+import io
+import shutil
 import requests
-import json
+import orjson
 import argparse
+from google.api_core.exceptions import PreconditionFailed
 from google.cloud import storage
 import logging
-import subprocess
+import google.auth
+from google.auth.exceptions import GoogleAuthError
+from google.auth.transport.requests import Request
 from requests.adapters import HTTPAdapter
 from datetime import datetime
 import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib3.util.retry import Retry
 
 # Configure logging
@@ -24,47 +32,80 @@ ZIPFILE_NAME = f"{TODAY}_backup.zip"
 GCS_BACKUP_FOLDER = "cdf/latest"
 GCS_ARCHIVE_FOLDER = "cdf/archive"
 
+# CDAP endpoints
+BASE_URL = f"https://{CDAP_BASE_URL.rstrip('/')}/"
+NAMESPACES_URL = BASE_URL + "api/v3/namespaces"
+NAMESPACE_URL = NAMESPACES_URL + "/{namespace}"
+APP_URL = NAMESPACE_URL + "/apps/{app}"
+EXPORT_URL = BASE_URL + "api/v3/export/apps"
+STUDIO_URL = NAMESPACES_URL + "/system/apps/pipeline/services/studio/methods/v1/contexts/{namespace}"
+DRAFTS_URL = STUDIO_URL + "/drafts"
+DRAFT_URL = DRAFTS_URL + "/{draft_id}"
+CONNECTIONS_URL = STUDIO_URL + "/connections"
+CONNECTION_URL = CONNECTIONS_URL + "/{connection}"
+
+MAX_WORKERS = 16
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+GCS_CHUNK_SIZE = 8 * 1024 * 1024
+ZIP_COMPRESSLEVEL = 1
+ZIP_STORED_SUFFIXES = (".zip", ".gz", ".png", ".jpg")
+# (connect, read) timeouts in seconds, the export is generated server side before the first byte is sent
+REQUEST_TIMEOUT = (10, 30)
+EXPORT_TIMEOUT = (10, 300)
+
 # curl -X GET https://ci-dev-cdf-asne1-01-apc-serverless-anycloud-dot-ane1.datafusion.googleusercontent.com/api/v3/namespaces/backup_namespace/apps/ -H "Authorization: Bearer $(gcloud auth application-default print-access-token)" --output Raw_PII_ETL_1.json
 
-storage_client = storage.Client()
+# Created on first use so parsing arguments does not trigger auth, then shared by every thread
+_client = None
+
+
+def client():
+    global _client
+    _client = _client or storage.Client()
+    return _client
 
 # Retry configuration
-# retry_strategy = Retry(
-#     total=3,
-#     backoff_factor=2,
-#     status_forcelist=[500, 502, 503, 504],
-#     method_whitelist=["GET", "POST"]
-# )
-adapter = HTTPAdapter()
+retry_strategy = Retry(
+    total=5,
+    backoff_factor=0.5,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=frozenset(["GET", "PUT", "POST"])
+)
+# Pool sized above MAX_WORKERS so concurrent requests keep their connections alive
+adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry_strategy)
 session = requests.Session()
 session.mount("https://", adapter)
 session.mount("http://", adapter)
 
 
+# Application default credentials, cached so the token is only refreshed near expiry
+credentials = None
+
+
 def get_access_token():
     """
-    Retrieve an access token using the gcloud CLI.
+    Retrieve an access token from the application default credentials.
     """
+    global credentials
     try:
-        result = subprocess.run(
-            ["gcloud", "auth", "application-default", "print-access-token"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=True,
-            text=True
-        )
-        access_token = result.stdout.strip()
-        logging.info("Successfully retrieved access token.")
-        return access_token
-    except subprocess.CalledProcessError as e:
-        logging.critical(f"Failed to retrieve access token: {e.stderr}")
+        if credentials is None:
+            credentials, _ = google.auth.default(scopes=["https://www.googleapis.com/auth/cloud-platform"])
+
+        # valid is false when there is no token yet or it is about to expire
+        if not credentials.valid:
+            credentials.refresh(Request())
+            logging.info("Successfully retrieved access token.")
+
+        return credentials.token
+    except GoogleAuthError as e:
+        logging.critical(f"Failed to retrieve access token: {e}")
         raise Exception("Unable to retrieve access token. Ensure you are authenticated using gcloud.")
 
 
 # Helper Functions
 def fetch_namespaces(headers):
     try:
-        response = session.get(f"https://{CDAP_BASE_URL}api/v3/namespaces", headers=headers)
+        response = session.get(NAMESPACES_URL, headers=headers, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -73,30 +114,23 @@ def fetch_namespaces(headers):
 
 def fetch_applications(headers):
     try:
-        # Define the URL for the export API
-        response  = session.get(f"https://{CDAP_BASE_URL}api/v3/export/apps", headers=headers, stream=True)
+        # Define the URL for the export API, the ZIP is already compressed so skip transfer encoding
+        export_headers = {**headers, "Accept-Encoding": "identity"}
 
-        # Ensure the output directory exists
-        if not os.path.exists(BACKUP_DIRECTORY):
-            os.makedirs(BACKUP_DIRECTORY)
+        # Buffer the export in memory, it is only needed until it is extracted
+        export_zip = io.BytesIO()
+        with session.get(EXPORT_URL, headers=export_headers, stream=True,
+                         timeout=EXPORT_TIMEOUT) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                export_zip.write(chunk)
 
-        # Path to save the downloaded ZIP file
-        zip_path = os.path.join(BACKUP_DIRECTORY, "exported_apps.zip")
+        logging.info(f"Downloaded application export ({export_zip.tell()} bytes).")
 
-        if response.status_code != 200:
-            raise Exception(f"Failed to export applications: {response.status_code} {response.reason}")
-
-        # Write the response content to the ZIP file
-        with open(zip_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-
-        logging.info(f"Downloaded application export to: {zip_path}")
-
-        # Extract the ZIP file
+        # Extract the ZIP file straight from memory
         extracted_dir = os.path.join(BACKUP_DIRECTORY, f"{TODAY}_backup")
-        with zipfile.ZipFile(zip_path, "r") as zip_ref:
-            zip_ref.extractall(extracted_dir)
+        with zipfile.ZipFile(export_zip, "r") as zip_ref:
+            extract_zip(zip_ref, extracted_dir)
 
         logging.info(f"Extracted application details to: {extracted_dir}")
 
@@ -108,7 +142,7 @@ def fetch_applications(headers):
 
 def fetch_pipelines_list(namespace, headers):
     try:
-        response = session.get(f"https://{CDAP_BASE_URL}/api/v3/namespaces/system/apps/pipeline/services/studio/methods/v1/contexts/{namespace}/drafts", headers=headers)
+        response = session.get(DRAFTS_URL.format(namespace=namespace), headers=headers, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -118,7 +152,7 @@ def fetch_pipelines_list(namespace, headers):
 
 def fetch_pipeline(namespace, header, draft_id):
     try:
-        response = session.get(f"https://{CDAP_BASE_URL}api/v3/namespaces/system/apps/pipeline/services/studio/methods/v1/contexts/{namespace}/drafts/{draft_id}", headers=header)
+        response = session.get(DRAFT_URL.format(namespace=namespace, draft_id=draft_id), headers=header, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -129,8 +163,8 @@ def fetch_pipeline(namespace, header, draft_id):
 def fetch_connections(namespace, headers):
     try:
         response = session.get(
-            f"https://{CDAP_BASE_URL}/api/v3/namespaces/system/apps/pipeline/services/studio/methods/v1/contexts/{namespace}/connections",
-            headers=headers)
+            CONNECTIONS_URL.format(namespace=namespace),
+            headers=headers, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -138,22 +172,87 @@ def fetch_connections(namespace, headers):
         return []
 
 
-def save_to_gcs(file_name, file_path, bucket_folder):
+def save_to_gcs(file_name, file_path, bucket_folder, if_generation_match=None):
     try:
 
-        # Upload the .zip file to GCS
-        bucket = storage_client.bucket(GCS_BUCKET_NAME)
-        blob = bucket.blob(f"{bucket_folder}/{file_name}")
-        blob.upload_from_filename(file_path)
+        # Upload the .zip file to GCS in resumable chunks
+        bucket = client().bucket(GCS_BUCKET_NAME)
+        blob = bucket.blob(f"{bucket_folder}/{file_name}", chunk_size=GCS_CHUNK_SIZE)
+        try:
+            blob.upload_from_filename(file_path, if_generation_match=if_generation_match)
+        except PreconditionFailed:
+            logging.warning(f"'{blob.name}' already exists in GCS bucket '{GCS_BUCKET_NAME}'. Keeping the existing file.")
+            return
 
         logging.info(f"Zip file uploaded to GCS bucket '{GCS_BUCKET_NAME}' as '{file_name}'.")
+        return blob
     except Exception as e:
         logging.error(f"Failed to save {file_name} to GCS: {e}")
 
 
+def copy_in_gcs(blob, file_name, bucket_folder):
+    try:
+
+        # Copy server side so the file is not uploaded twice
+        bucket = client().bucket(GCS_BUCKET_NAME)
+        bucket.copy_blob(blob, bucket, new_name=f"{bucket_folder}/{file_name}")
+
+        logging.info(f"Copied '{blob.name}' in GCS bucket '{GCS_BUCKET_NAME}' to '{bucket_folder}/{file_name}'.")
+    except Exception as e:
+        logging.error(f"Failed to copy {blob.name} to {bucket_folder}/{file_name} in GCS: {e}")
+
+
+def compress_file(file_path, arcname):
+    """
+    Reads a file and compresses it with raw deflate so it can be stored in a .zip file as-is.
+    Files that are already compressed are stored without deflating them again.
+
+    Args:
+        file_path (str): The path of the file to compress.
+        arcname (str): The name of the file inside the archive.
+
+    Returns:
+        tuple: The ZipInfo describing the entry and its compressed bytes.
+    """
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    with open(file_path, 'rb') as f:
+        data = f.read()
+
+    if file_path.lower().endswith(ZIP_STORED_SUFFIXES):
+        zinfo.compress_type = zipfile.ZIP_STORED
+        compressed = data
+    else:
+        compressor = zlib.compressobj(ZIP_COMPRESSLEVEL, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+
+    zinfo.CRC = zlib.crc32(data)
+    zinfo.file_size = len(data)
+    zinfo.compress_size = len(compressed)
+    return zinfo, compressed
+
+
+def write_compressed_entry(zipf, zinfo, compressed):
+    """
+    Appends an entry produced by compress_file to an open .zip file without compressing it again.
+    zipfile has no public API for this, so the local header and data are written the same way ZipFile.write does.
+    """
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    zipf._writecheck(zinfo)
+    zipf._didModify = True
+
+    zinfo.header_offset = zipf.fp.tell()
+    zipf.fp.write(zinfo.FileHeader(zip64))
+    zipf.fp.write(compressed)
+
+    zipf.filelist.append(zinfo)
+    zipf.NameToInfo[zinfo.filename] = zinfo
+    zipf.start_dir = zipf.fp.tell()
+
+
 def compress_folder(folder_path):
     """
-    Compresses a folder into a .zip file and uploads it to a GCS bucket.
+    Compresses a folder into a .zip file, deflating the files in parallel.
 
     Args:
         folder_path (str): The path of the folder to compress.
@@ -166,14 +265,20 @@ def compress_folder(folder_path):
         if not os.path.exists(folder_path):
             raise FileNotFoundError(f"Folder '{folder_path}' does not exist.")
 
-        # Create a .zip file
+        entries = []
+        for root, _, files in os.walk(folder_path):
+            for file in files:
+                file_path = os.path.join(root, file)
+                arcname = os.path.relpath(file_path, folder_path)
+                entries.append((file_path, arcname))
+
+        # Compress the files concurrently, zlib releases the GIL while deflating
         zip_path = f"{folder_path}.zip"
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, _, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, folder_path)
-                    zipf.write(file_path, arcname)
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor, \
+                zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL,
+                                allowZip64=True) as zipf:
+            for zinfo, compressed in executor.map(lambda entry: compress_file(*entry), entries):
+                write_compressed_entry(zipf, zinfo, compressed)
 
         logging.info(f"Compressed folder saved at: {zip_path}")
 
@@ -185,9 +290,10 @@ def compress_folder(folder_path):
 
 def load_from_gcs(file_name):
     try:
-        bucket = storage_client.bucket(GCS_BUCKET_NAME)
-        blob = bucket.blob(file_name)
-        data = json.loads(blob.download_as_text())
+        bucket = client().bucket(GCS_BUCKET_NAME)
+        blob = bucket.blob(file_name, chunk_size=GCS_CHUNK_SIZE)
+        with blob.open("rb") as f:
+            data = orjson.loads(f.read())
         logging.info(f"Loaded {file_name} from GCS.")
         return data
     except Exception as e:
@@ -195,31 +301,68 @@ def load_from_gcs(file_name):
         return {}
 
 
-def read_from_file(file_path):
+def read_from_zip(zip_ref, member):
     try:
-        with open(file_path, 'r') as file:
-            return json.load(file)
+        return orjson.loads(zip_ref.read(member))
     except Exception as e:
-        raise Exception(f"Error reading JSON file at '{file_path}': {e}")
+        name = member.filename if isinstance(member, zipfile.ZipInfo) else member
+        raise Exception(f"Error reading JSON file '{name}' from '{zip_ref.filename}': {e}")
+
+
+def file_crc32(file_path):
+    crc = 0
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def extract_zip(zip_ref, extract_dir):
+    """
+    Extracts the files of a .zip file, skipping directory entries, macOS metadata
+    and members that are already on disk with the same contents.
+
+    Args:
+        zip_ref (zipfile.ZipFile): The opened .zip file.
+        extract_dir (str): The directory to extract the contents into.
+    """
+    extract_dir = os.path.abspath(extract_dir)
+    for info in zip_ref.infolist():
+        if info.filename.startswith("__MACOSX/") or info.filename.endswith("/"):
+            continue
+
+        target_path = os.path.normpath(os.path.join(extract_dir, info.filename))
+        if not target_path.startswith(extract_dir + os.sep):
+            logging.warning(f"Skipping '{info.filename}' as it would be extracted outside '{extract_dir}'.")
+            continue
+
+        if (os.path.isfile(target_path)
+                and os.path.getsize(target_path) == info.file_size
+                and file_crc32(target_path) == info.CRC):
+            continue
+
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        with zip_ref.open(info, 'r') as src, open(target_path, 'wb', buffering=DOWNLOAD_CHUNK_SIZE) as dst:
+            shutil.copyfileobj(src, dst, length=DOWNLOAD_CHUNK_SIZE)
 
 
-def download_and_unzip_from_gcs(gcs_folder_path, version=None):
+def download_from_gcs(gcs_folder_path, version=None):
     """
-    Downloads a .zip file from a GCS bucket, saves it locally, and unzips it.
+    Downloads a .zip file from a GCS bucket and saves it locally.
 
     Args:
         bucket_name (str): The name of the GCS bucket.
         folder_path (str): The folder path in the bucket where the .zip file is located.
         zip_filename (str): The name of the .zip file to download.
-        local_download_path (str): The local directory to save and extract the contents of the .zip file.
+        local_download_path (str): The local directory to save the .zip file in.
         :param version:
 
     Returns:
-        str: Success message or raises an exception if an error occurs.
+        str: The local path of the downloaded .zip file.
 
     """
     try:
-        bucket = storage_client.bucket(GCS_BUCKET_NAME)
+        bucket = client().bucket(GCS_BUCKET_NAME)
 
         blobs = bucket.list_blobs(prefix=gcs_folder_path)
 
@@ -243,11 +386,9 @@ def download_and_unzip_from_gcs(gcs_folder_path, version=None):
 
         else:
             zip_blob = zip_files[0]
-            # zip_filename = zip_blob.name.split("/")[-1]
-            print(zip_blob.name)
+            logging.debug("Restoring from latest backup %s", zip_blob.name)
 
         zip_filename = zip_blob.name.split("/")[-1]
-        extract_dir = zip_blob.name.split("/")[-1][:-4]
 
         # Ensure the local download directory exists
         if not os.path.exists(RESTORE_DIRECTORY):
@@ -255,100 +396,97 @@ def download_and_unzip_from_gcs(gcs_folder_path, version=None):
 
         # Full path to save the .zip file locally
         local_zip_path = os.path.join(RESTORE_DIRECTORY, zip_filename)
-        local_extract_path = os.path.join(RESTORE_DIRECTORY, extract_dir)
-
-        # Download the .zip file from GCS
+        marker_path = f"{local_zip_path}.md5"
+
+        # Skip the download entirely if this exact archive was already downloaded
+        zip_md5 = base64.b64decode(zip_blob.md5_hash).hex() if zip_blob.md5_hash else None
+        if zip_md5 and os.path.exists(local_zip_path) and os.path.exists(marker_path):
+            with open(marker_path, 'r') as f:
+                if f.read() == zip_md5:
+                    logging.info(f"'{zip_filename}' is already downloaded to '{local_zip_path}'. Skipping download.")
+                    return local_zip_path
+
+        # Download the .zip file from GCS in chunks rather than buffering it in memory
+        zip_blob.chunk_size = GCS_CHUNK_SIZE
         zip_blob.download_to_filename(local_zip_path)
         logging.info(f"Downloaded '{zip_filename}' from GCS bucket '{GCS_BUCKET_NAME}/{gcs_folder_path}' to '{RESTORE_DIRECTORY}'.")
 
-        # Unzip the file
-        with zipfile.ZipFile(local_zip_path, 'r') as zip_ref:
-            zip_ref.extractall(local_extract_path)
-        logging.info(f"Unzipped contents to '{local_extract_path}'.")
+        if zip_md5:
+            with open(marker_path, 'w') as f:
+                f.write(zip_md5)
 
-        logging.info(f"File '{zip_filename}' downloaded and extracted successfully to '{local_extract_path}'.")
-
-        return local_extract_path
+        return local_zip_path
 
     except Exception as e:
-        raise Exception(f"Failed to download and unzip file: {e}")
+        raise Exception(f"Failed to download file: {e}")
 
 
-def save_to_file(filename, content):
+def save_json(file_path, content, pretty=False):
     """
-    Create a file with the given JSON content in a folder at the same location as the script.
+    Write the given JSON content to a file. The parent directory must already exist.
 
     Args:
-        filename (str): The name of the file to be created.
+        file_path (str): The path of the file to be created.
         content (dict): The JSON content to write into the file.
-
-    Returns:
-        str: Success message or raises an exception if an error occurs.
+        pretty (bool): Indent the JSON for human inspection instead of writing it compactly.
     """
     try:
-
-        # Create a folder at the script's directory if not present
-        backup_dir = BACKUP_DIRECTORY
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir)
-
-        # Full path to the file
-        file_path = os.path.join(backup_dir, filename)
-
-        # Write the JSON content to the file
-        with open(file_path, 'w') as file:
-            json.dump(content, file, indent=4)  # Format JSON with indentation
+        with open(file_path, 'wb') as file:
+            file.write(orjson.dumps(content, option=orjson.OPT_INDENT_2 if pretty else None))
 
         logging.info(f"File '{file_path}' created successfully.")
     except Exception as e:
-        raise Exception(f"Failed to create file '{filename}': {e}")
+        raise Exception(f"Failed to create file '{file_path}': {e}")
 
-def format_deployed_apps(apps_location, namespaces):
-    logging.info("*********Formatting Application****************")
-    for namespace in namespaces:
-        name = namespace["name"]
-        namespace_dir = os.path.join(apps_location, name)
 
-        if not os.path.exists(namespace_dir):
-            logging.warning(f"Namespace directory '{namespace_dir}' does not exist. Skipping.")
-            continue
+def format_deployed_app(namespace_dir, file):
+    file_path = os.path.join(namespace_dir, file)
+    try:
+        # Open and read the JSON file
+        with open(file_path, 'rb') as f:
+            response = orjson.loads(f.read())
 
-        # Iterate through files in the directory
-        for file in os.listdir(namespace_dir):
-            file_path = os.path.join(namespace_dir, file)
+        # Extract and parse the configuration field
+        configuration_str = response.get("configuration", "")
 
-            if os.path.isfile(file_path):
-                try:
-                    # Open and read the JSON file
-                    with open(file_path, 'r') as f:
-                        response = json.load(f)
+        try:
+            # Decode the configuration string into a dictionary
+            configuration_dict = orjson.loads(configuration_str)
 
-                    # Extract and parse the configuration field
-                    configuration_str = response.get("configuration", "")
+            # Replace the original string with the parsed object
+            response["configuration"] = configuration_dict
 
-                    try:
-                        # Decode the configuration string into a dictionary
-                        configuration_dict = json.loads(configuration_str)
+        except orjson.JSONDecodeError as e:
+            logging.error(f"Failed to parse configuration in file '{file_path}': {e}")
+            return
 
-                        # Replace the original string with the parsed object
-                        response["configuration"] = configuration_dict
+        # Write the formatted JSON under its new name, then drop the original
+        new_file_path = os.path.join(namespace_dir, f"app_{os.path.splitext(file)[0]}.json")
+        with open(new_file_path, 'wb') as f:
+            f.write(orjson.dumps(response, option=orjson.OPT_INDENT_2))
+        os.unlink(file_path)
 
-                    except json.JSONDecodeError as e:
-                        logging.error(f"Failed to parse configuration in file '{file_path}': {e}")
-                        continue
+        logging.info(f"Formatted and renamed file: {file_path} -> {new_file_path}")
 
-                    # Write the formatted JSON back to the same file
-                    with open(file_path, 'w') as f:
-                        json.dump(response, f, indent=4)
+    except Exception as e:
+        logging.error(f"Error processing file '{file_path}': {e}")
 
-                    # Rename the file with a '_formatted' suffix
-                    new_file_path = os.path.join(namespace_dir, f"app_{os.path.splitext(file)[0]}.json")
-                    os.rename(file_path, new_file_path)
 
-                    logging.info(f"Formatted and renamed file: {file_path} -> {new_file_path}")
+def format_deployed_apps(apps_location, namespaces):
+    logging.info("*********Formatting Application****************")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for namespace in namespaces:
+            name = namespace["name"]
+            namespace_dir = os.path.join(apps_location, name)
 
-                except Exception as e:
-                    logging.error(f"Error processing file '{file_path}': {e}")
+            if not os.path.exists(namespace_dir):
+                logging.warning(f"Namespace directory '{namespace_dir}' does not exist. Skipping.")
+                continue
+
+            # Format every file in the directory concurrently
+            for file in os.listdir(namespace_dir):
+                if os.path.isfile(os.path.join(namespace_dir, file)):
+                    executor.submit(format_deployed_app, namespace_dir, file)
 
 
 # Backup Application State
@@ -369,139 +507,194 @@ def backup_application_state(headers):
         os.makedirs(zip_folder)
 
     file_path = os.path.join(zip_folder, "namespaces.json")
-    save_to_file(file_path, namespaces)
-
-    for namespace in namespaces:
-        namespace_name = namespace["name"]
+    save_json(file_path, namespaces)
 
-        try:
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # List drafts and connections of every namespace concurrently
+        listings = {}
+        for namespace in namespaces:
+            namespace_name = namespace["name"]
 
             namespace_dir = os.path.join(zip_folder, namespace_name)
             if not os.path.exists(namespace_dir):
                 logging.info(f"Creating namespace directory : '{namespace_name}'.")
                 os.makedirs(namespace_dir)
 
-            logging.info(f"*************Fetching Pipelines from {namespace_name}********************")
-            pipelines_list = fetch_pipelines_list(namespace_name, headers)
-            for pipeline in pipelines_list:
-                pipeline_name = pipeline.get('name')
-                draft_id = pipeline.get('id')
-                content = fetch_pipeline(namespace_name, headers, draft_id)
-                pipeline_file_path = os.path.join(namespace_dir, f"draft_{pipeline_name}.json")
-
-                save_to_file(pipeline_file_path, content)
-
-            logging.info(f"***************Fetching Connections from {namespace_name}*****************")
-            connections = fetch_connections(namespace_name, headers)
-            for connection in connections:
-                connection_name = connection.get('name')
-                connection_file_path = os.path.join(namespace_dir, f"conn_{connection_name}.json")
-                save_to_file(connection_file_path, connection)
-        except Exception as e:
-            logging.error(f"Failed to fetch connections/pipelines for namespace '{namespace_name}': {e.args}")
+            logging.info(f"*************Fetching Pipelines and Connections from {namespace_name}********************")
+            listings[namespace_name] = (
+                executor.submit(fetch_pipelines_list, namespace_name, headers),
+                executor.submit(fetch_connections, namespace_name, headers),
+            )
+
+        # Fetch every draft concurrently once its namespace listing resolves
+        pipeline_futures = {}
+        for namespace_name, (pipelines_future, connections_future) in listings.items():
+            namespace_dir = os.path.join(zip_folder, namespace_name)
+            try:
+                for pipeline in pipelines_future.result():
+                    pipeline_name = pipeline.get('name')
+                    draft_id = pipeline.get('id')
+                    pipeline_file_path = os.path.join(namespace_dir, f"draft_{pipeline_name}.json")
+                    future = executor.submit(fetch_pipeline, namespace_name, headers, draft_id)
+                    pipeline_futures[future] = pipeline_file_path
+
+                for connection in connections_future.result():
+                    connection_name = connection.get('name')
+                    connection_file_path = os.path.join(namespace_dir, f"conn_{connection_name}.json")
+                    save_json(connection_file_path, connection, pretty=True)
+            except Exception as e:
+                logging.error(f"Failed to fetch connections/pipelines for namespace '{namespace_name}': {e.args}")
+
+        for future in as_completed(pipeline_futures):
+            pipeline_file_path = pipeline_futures[future]
+            try:
+                save_json(pipeline_file_path, future.result(), pretty=True)
+            except Exception as e:
+                logging.error(f"Failed to save pipeline '{pipeline_file_path}': {e.args}")
 
     try:
         logging.info("***************Compressing and uploading the backup files to GCS******************************")
 
         zip_path = compress_folder(zip_folder)
 
-        save_to_gcs(ZIPFILE_NAME, zip_path ,GCS_ARCHIVE_FOLDER)
+        archive_blob = save_to_gcs(ZIPFILE_NAME, zip_path, GCS_ARCHIVE_FOLDER, if_generation_match=0)
 
-        save_to_gcs("backup.zip", zip_path, GCS_BACKUP_FOLDER)
+        # The dated archive is never overwritten, a rerun on the same day uploads the new zip as latest only
+        if archive_blob:
+            copy_in_gcs(archive_blob, "backup.zip", GCS_BACKUP_FOLDER)
+        else:
+            save_to_gcs("backup.zip", zip_path, GCS_BACKUP_FOLDER)
 
     except Exception as e:
         logging.error(f"Failed to compress and upload backup files to GCS: {e}")
 
 
 # Restore Application State
-def restore_application_state(headers, restore_version=None):
-
-    if restore_version:
-        zip_blob_path = download_and_unzip_from_gcs(GCS_ARCHIVE_FOLDER, restore_version)
-    else:
-        zip_blob_path = download_and_unzip_from_gcs(GCS_BACKUP_FOLDER)
-
-    namespace_file_path = os.path.join(zip_blob_path, "namespaces.json")
-    namespaces = read_from_file(namespace_file_path)
-    if not namespaces:
-        logging.warning("No namespaces found in backup. Exiting restore process.")
-        return
-
-    for namespace in namespaces:
-        name = namespace["name"]
+def restore_namespace(namespace, headers):
+    name = namespace["name"]
+    try:
+        response = session.put(NAMESPACE_URL.format(namespace=name), json=namespace,
+                               headers=headers, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        logging.info(f"Namespace '{name}' recreated successfully.")
+        return True
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Failed to recreate namespace '{name}': {e}")
+        return False
 
-        conn_files = []
-        pipeline_files = []
-        deployed_apps = []
-        namespace_dir = os.path.join(zip_blob_path, name)
 
-        # Iterate through files in the directory
-        for file in os.listdir(namespace_dir):
-            if os.path.isfile(os.path.join(namespace_dir, file)):
-                if file.startswith("conn"):
-                    conn_files.append(file)
-                elif file.startswith("draft"):
-                    pipeline_files.append(file)
-                else:
-                    deployed_apps.append(file)
+def restore_app(namespace, app, app_pipeline, headers):
+    try:
+        app_name = app_pipeline.get("name")
+        response = session.put(
+            APP_URL.format(namespace=namespace, app=app_name), json=app_pipeline, headers=headers,
+            timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        logging.info(f"App '{app}' recreated successfully in '{namespace}' namespace.")
+    except Exception as e:
+        logging.error(f"Failed to recreate app '{app}': {e}")
 
 
-        if name != "default":
+def restore_draft(namespace, pipeline, headers):
+    try:
+        pipeline_name = pipeline["id"]
 
-            try:
-                # Recreate namespace
-                response = session.put(f"https://{CDAP_BASE_URL}api/v3/namespaces/{name}", json=namespace,
-                                       headers=headers)
-                response.raise_for_status()
-                logging.info(f"Namespace '{name}' recreated successfully.")
-            except requests.exceptions.RequestException as e:
-                logging.error(f"Failed to recreate namespace '{name}': {e}")
-                continue
+        response = session.put(
+            DRAFT_URL.format(namespace=namespace, draft_id=pipeline_name),
+            json=pipeline,
+            headers=headers,
+            timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        logging.info(f"Pipeline '{pipeline['name']}' restored in namespace '{namespace}'.")
+    except Exception as e:
+        logging.error(f"Failed to restore pipeline '{pipeline['name']}' in namespace '{namespace}': {e}")
 
-        #Recreate Deployed Pipelines
-        for app in deployed_apps:
-            app_pipeline = read_from_file(os.path.join(namespace_dir, app))
 
-            try:
-                app_name = app_pipeline.get("name")
-                response = session.put(
-                f"https://{CDAP_BASE_URL}api/v3/namespaces/{name}/apps/{app_name}", json=app_pipeline, headers=headers)
-                response.raise_for_status()
-                logging.info(f"App '{app}' recreated successfully in '{name}' namespace.")
+def restore_connection(namespace, connection, headers):
+    connection_name = connection["name"]
 
-            except Exception as e:
-                logging.error(f"Failed to recreate app '{app}': {e}")
+    try:
+        response = session.put(
+            CONNECTION_URL.format(namespace=namespace, connection=connection_name),
+            json=connection,
+            headers=headers,
+            timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        logging.info(f"Connection '{connection['name']}' restored in namespace '{namespace}'.")
+    except requests.exceptions.RequestException as e:
+        logging.error(
+            f"Failed to restore connection '{connection['name']}' in namespace '{namespace}': {e}")
 
-        # Recreate Draft pipelines
-        for blob in pipeline_files:
-            pipeline = read_from_file(os.path.join(namespace_dir, blob))
-            try:
-                pipeline_name = pipeline["id"]
-
-                response = session.put(
-                    f"https://{CDAP_BASE_URL}api/v3/namespaces/system/apps/pipeline/services/studio/methods/v1/contexts/{name}/drafts/{pipeline_name}",
-                    json=pipeline,
-                    headers=headers)
-                response.raise_for_status()
-                logging.info(f"Pipeline '{pipeline['name']}' restored in namespace '{name}'.")
-            except Exception as e:
-                logging.error(f"Failed to restore pipeline '{pipeline['name']}' in namespace '{name}': {e}")
 
-            # Recreate connections
-            for blob in conn_files:
-                connection = read_from_file(os.path.join(namespace_dir, blob))
-                connection_name = connection["name"]
+def restore_application_state(headers, restore_version=None):
 
+    if restore_version:
+        local_zip_path = download_from_gcs(GCS_ARCHIVE_FOLDER, restore_version)
+    else:
+        local_zip_path = download_from_gcs(GCS_BACKUP_FOLDER)
+
+    # Read the backup straight from the archive instead of extracting it
+    with zipfile.ZipFile(local_zip_path, 'r') as zip_ref:
+        namespaces = read_from_zip(zip_ref, "namespaces.json")
+        if not namespaces:
+            logging.warning("No namespaces found in backup. Exiting restore process.")
+            return
+
+        # Group the archive entries by the namespace folder they belong to
+        namespace_files = {}
+        for info in zip_ref.infolist():
+            namespace_name, _, file = info.filename.partition("/")
+            if file and "/" not in file:
+                namespace_files.setdefault(namespace_name, []).append(info)
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            # Recreate all namespaces concurrently, their contents are submitted once each one exists
+            namespace_futures = {
+                namespace["name"]: executor.submit(restore_namespace, namespace, headers)
+                for namespace in namespaces if namespace["name"] != "default"
+            }
+
+            futures = []
+            for namespace in namespaces:
+                name = namespace["name"]
+
+                conn_files = []
+                pipeline_files = []
+                deployed_apps = []
+
+                for info in namespace_files.get(name, []):
+                    file = info.filename.rsplit("/", 1)[-1]
+                    if file.startswith("conn"):
+                        conn_files.append(info)
+                    elif file.startswith("draft"):
+                        pipeline_files.append(info)
+                    else:
+                        deployed_apps.append(info)
+
+                if name in namespace_futures and not namespace_futures[name].result():
+                    continue
+
+                #Recreate Deployed Pipelines
+                for app in deployed_apps:
+                    app_pipeline = read_from_zip(zip_ref, app)
+                    futures.append(executor.submit(restore_app, name, app.filename, app_pipeline, headers))
+
+                # Recreate Draft pipelines
+                for pipeline_file in pipeline_files:
+                    pipeline = read_from_zip(zip_ref, pipeline_file)
+                    futures.append(executor.submit(restore_draft, name, pipeline, headers))
+
+                # Recreate connections
+                for conn_file in conn_files:
+                    connection = read_from_zip(zip_ref, conn_file)
+                    futures.append(executor.submit(restore_connection, name, connection, headers))
+
+            # Collect every result so one failed restore does not abort the others
+            for future in as_completed(futures):
                 try:
-                    response = session.put(
-                        f"https://{CDAP_BASE_URL}api/v3/namespaces/system/apps/pipeline/services/studio/methods/v1/contexts/{name}/connections/{connection_name}",
-                        json=connection,
-                        headers=headers)
-                    response.raise_for_status()
-                    logging.info(f"Connection '{connection['name']}' restored in namespace '{name}'.")
-                except requests.exceptions.RequestException as e:
-                    logging.error(
-                        f"Failed to restore connection '{connection['name']}' in namespace '{name}': {e}")
+                    future.result()
+                except Exception as e:
+                    logging.error(f"Failed to restore namespace contents: {e}")
 
 
 # Main Function
@@ -514,6 +707,7 @@ def main():
     try:
 
         access_token = get_access_token()
+        client()
         headers = {"Authorization": f"Bearer {access_token}"}
 
         if args.operation == "backup":
@@ -1,13 +1,23 @@
 import os
 import requests
-import json
+import orjson
+import gzip
+import io
+import time
+import tempfile
 import argparse
+from google.api_core.exceptions import NotFound
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
 import logging
-import subprocess
+import google.auth
+from google.auth.exceptions import GoogleAuthError
+from google.auth.transport.requests import AuthorizedSession
 from requests.adapters import HTTPAdapter
 from datetime import datetime
-import zipfile
+import tarfile
+import zstandard
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib3.util.retry import Retry
 
 # Configure logging
@@ -15,53 +25,90 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 # Constants
 CDAP_BASE_URL = "ci-dev-cdf-asne1-01-apc-serverless-anycloud-dot-ane1.datafusion.googleusercontent.com/"
+BASE = f"https://{CDAP_BASE_URL.rstrip('/')}"
 GCS_BUCKET_NAME = "ci-dev-configurations-asia-northeast1"
 DIRECTORY = os.path.dirname(os.path.abspath(__file__))
 TODAY = datetime.now().strftime("%Y-%m-%d")
 BACKUP_DIRECTORY = os.path.join(DIRECTORY, f"{TODAY}_backup")
 ZIPFILE = os.path.join(DIRECTORY , f"{TODAY}_backup.zip")
+MAX_WORKERS = 16
+# (connect, read) seconds, so a stalled CDAP call fails instead of pinning a worker
+REQUEST_TIMEOUT = (10, 30)
+GCS_BACKUP_FOLDER = "cdf/latest"
+UPLOAD_CHUNK_SIZE = 32 * 1024 * 1024
+UPLOAD_WORKERS = 8
+ARCHIVE_COMPRESSION_LEVEL = 3
+# Standalone JSON uploads are small and compress well at the fastest level
+GZIP_COMPRESSLEVEL = 1
+# Listings only need object names, the prefixes are flat so the delimiter is kept
+LIST_PAGE_SIZE = 1000
+LIST_FIELDS = "items(name),nextPageToken"
+# ETag of every pipeline in the latest archive, lets unchanged pipelines be answered with a 304
+ETAG_CACHE = GCS_BACKUP_FOLDER + "/{kind}_etags.json"
+
+# CDAP endpoints
+NAMESPACES_URL = f"{BASE}/api/v3/namespaces"
+NAMESPACE_URL = NAMESPACES_URL + "/{namespace}"
+APPS_URL = NAMESPACE_URL + "/apps"
+APP_URL = APPS_URL + "/{pipeline_id}"
+STUDIO_URL = NAMESPACES_URL + "/system/apps/pipeline/services/studio/methods/v1/contexts/{namespace}"
+DRAFTS_URL = STUDIO_URL + "/drafts"
+DRAFT_URL = DRAFTS_URL + "/{pipeline_id}"
+CONNECTIONS_URL = STUDIO_URL + "/connections"
+CONNECTION_URL = CONNECTIONS_URL + "/{connection}"
+# Where pipelines of each --kind are listed, fetched and restored, and the field naming them in those URLs
+PIPELINE_URLS = {
+    "apps": {"list": APPS_URL, "fetch": APP_URL, "id_key": "name", "restore": APP_URL, "restore_id_key": "name"},
+    "drafts": {"list": DRAFTS_URL, "fetch": DRAFT_URL, "id_key": "id", "restore": DRAFT_URL, "restore_id_key": "id"},
+}
 
 # curl -X GET https://ci-dev-cdf-asne1-01-apc-serverless-anycloud-dot-ane1.datafusion.googleusercontent.com/api/v3/namespaces/backup_namespace/apps/ -H "Authorization: Bearer $(gcloud auth application-default print-access-token)" --output Raw_PII_ETL_1.json
 
-storage_client = storage.Client()
+# Created on first use so parsing arguments does not trigger auth, then shared by every thread
+_client = None
+
+
+def client():
+    global _client
+    _client = _client or storage.Client()
+    return _client
+
+
+def bucket():
+    return client().bucket(GCS_BUCKET_NAME)
 
 # Retry configuration
-# retry_strategy = Retry(
-#     total=3,
-#     backoff_factor=2,
-#     status_forcelist=[500, 502, 503, 504],
-#     method_whitelist=["GET", "POST"]
-# )
-adapter = HTTPAdapter()
-session = requests.Session()
-session.mount("https://", adapter)
-session.mount("http://", adapter)
-
-
-def get_access_token():
-    """
-    Retrieve an access token using the gcloud CLI.
-    """
+retry_strategy = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=[500, 502, 503, 504],
+    allowed_methods=["GET", "PUT", "POST"]
+)
+# Every call targets the single CDAP host, so one pool holds all the keep-alive connections
+adapter = HTTPAdapter(pool_connections=1, pool_maxsize=64, max_retries=retry_strategy)
+
+# Application default credentials, the session injects the bearer token and refreshes it when it expires.
+# It is created in main() so auth failures are reported like any other error, then shared by every thread
+session = None
+
+
+def create_session():
     try:
-        result = subprocess.run(
-            ["gcloud", "auth", "application-default", "print-access-token"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=True,
-            text=True
-        )
-        access_token = result.stdout.strip()
-        logging.info("Successfully retrieved access token.")
-        return access_token
-    except subprocess.CalledProcessError as e:
-        logging.critical(f"Failed to retrieve access token: {e.stderr}")
+        credentials, _ = google.auth.default(scopes=["https://www.googleapis.com/auth/cloud-platform"])
+    except GoogleAuthError as e:
+        logging.critical(f"Failed to retrieve access token: {e}")
         raise Exception("Unable to retrieve access token. Ensure you are authenticated using gcloud.")
 
+    authorized_session = AuthorizedSession(credentials)
+    authorized_session.mount("https://", adapter)
+    authorized_session.mount("http://", adapter)
+    return authorized_session
+
 
 # Helper Functions
-def fetch_namespaces(headers):
+def fetch_namespaces():
     try:
-        response = session.get(f"https://{CDAP_BASE_URL}api/v3/namespaces", headers=headers)
+        response = session.get(NAMESPACES_URL, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -69,9 +116,10 @@ def fetch_namespaces(headers):
         return []
 
 
-def fetch_pipelines_list(namespace, headers):
+def fetch_pipelines_list(namespace, kind):
     try:
-        response = session.get(f"https://{CDAP_BASE_URL}api/v3/namespaces/{namespace}/apps", headers=headers)
+        list_url = PIPELINE_URLS[kind]["list"]
+        response = session.get(list_url.format(namespace=namespace), timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -79,21 +127,24 @@ def fetch_pipelines_list(namespace, headers):
         return []
 
 
-def fetch_pipeline(namespace, header, app):
+def fetch_pipeline(namespace, pipeline_id, kind, etag=None):
     try:
-        response = session.get(f"https://{CDAP_BASE_URL}api/v3/namespaces/{namespace}/apps/{app}", headers=header)
+        pipeline_url = PIPELINE_URLS[kind]["fetch"]
+        headers = {"If-None-Match": etag} if etag else None
+        response = session.get(pipeline_url.format(namespace=namespace, pipeline_id=pipeline_id), headers=headers,
+                               timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304:
+            return {"etag": etag, "content": None, "unchanged": True}
         response.raise_for_status()
-        return response.json()
+        return {"etag": response.headers.get("ETag"), "content": response.json(), "unchanged": False}
     except requests.exceptions.RequestException as e:
-        logging.error(f"Failed to fetch pipeline *{app}* from namespace '{namespace}': {e}")
+        logging.error(f"Failed to fetch pipeline *{pipeline_id}* from namespace '{namespace}': {e}")
         return
 
 
-def fetch_connections(namespace, headers):
+def fetch_connections(namespace):
     try:
-        response = session.get(
-            f"https://{CDAP_BASE_URL}/api/v3/namespaces/system/apps/pipeline/services/studio/methods/v1/contexts/{namespace}/connections",
-            headers=headers)
+        response = session.get(CONNECTIONS_URL.format(namespace=namespace), timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -103,63 +154,107 @@ def fetch_connections(namespace, headers):
 
 def save_to_gcs(file_name, data):
     try:
-        bucket = storage_client.bucket(GCS_BUCKET_NAME)
-        blob = bucket.blob(file_name)
-        blob.upload_from_string(json.dumps(data))
+        blob = bucket().blob(file_name)
+
+        # Store the JSON gzip encoded, GCS transparently decompresses it on download
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=GZIP_COMPRESSLEVEL) as gz:
+            gz.write(orjson.dumps(data))
+        buf.seek(0)
+        blob.content_encoding = 'gzip'
+        blob.upload_from_file(buf, size=buf.getbuffer().nbytes, content_type='application/json')
         logging.info(f"Saved {file_name} to GCS.")
     except Exception as e:
         logging.error(f"Failed to save {file_name} to GCS: {e}")
 
 
-def compress_folder_and_upload_to_gcs(folder_path, zip_filename):
+def upload_archive_to_gcs(archive_path, archive_filename):
     """
-    Compresses a folder into a .zip file and uploads it to a GCS bucket.
+    Uploads a backup archive to a GCS bucket.
 
     Args:
-        folder_path (str): The path of the folder to compress.
-        zip_filename (str): The name of the .zip file to create and upload.
+        archive_path (str): The local path of the .tar.zst file.
+        archive_filename (str): The name to upload the .tar.zst file as.
 
     Returns:
         str: Success message or raises an exception if an error occurs.
     """
     try:
-        # Ensure the folder exists
-        if not os.path.exists(folder_path):
-            raise FileNotFoundError(f"Folder '{folder_path}' does not exist.")
+        # Upload the .tar.zst file to GCS in chunks sent concurrently and composed server side
+        blob = bucket().blob(f"{GCS_BACKUP_FOLDER}/{archive_filename}")
+        blob.content_type = "application/zstd"
+        transfer_manager.upload_chunks_concurrently(
+            archive_path, blob, chunk_size=UPLOAD_CHUNK_SIZE, max_workers=UPLOAD_WORKERS,
+            worker_type=transfer_manager.THREAD)
+
+        return f"Archive '{archive_path}' uploaded to GCS bucket '{GCS_BUCKET_NAME}' as '{archive_filename}'."
 
-        # Create a .zip file
-        zip_path = f"{BACKUP_DIRECTORY}.zip"
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, _, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, folder_path)
-                    zipf.write(file_path, arcname)
+    except Exception as e:
+        raise Exception(f"Failed to upload archive: {e}")
 
-        print(f"Compressed folder saved at: {zip_path}")
 
-        # Upload the .zip file to GCS
-        # client = storage.Client()
-        bucket = storage_client.bucket(GCS_BUCKET_NAME)
-        blob = bucket.blob(zip_filename, sufix="cdf/latest/")
-        blob.upload_from_filename(zip_path)
+def add_to_bundle(tar, name, data):
+    payload = orjson.dumps(data)
+    info = tarfile.TarInfo(name=name)
+    info.size = len(payload)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(payload))
 
-        return f"Folder '{folder_path}' compressed and uploaded to GCS bucket '{GCS_BUCKET_NAME}' as '{zip_filename}'."
 
+def load_etags(kind):
+    blob = bucket().blob(ETAG_CACHE.format(kind=kind))
+    try:
+        return orjson.loads(blob.download_as_bytes())
+    except NotFound:
+        logging.info(f"No ETag cache found at {blob.name}, fetching every pipeline.")
     except Exception as e:
-        raise Exception(f"Failed to compress and upload folder: {e}")
+        logging.warning(f"Failed to load ETag cache {blob.name}, fetching every pipeline: {e}")
+    return {}
+
 
+def find_latest_archive(kind):
+    archives = [blob.name for blob in bucket().list_blobs(prefix=f"{GCS_BACKUP_FOLDER}/", delimiter="/",
+                                                          page_size=LIST_PAGE_SIZE, fields=LIST_FIELDS)
+                if blob.name.endswith(f"_{kind}_backup.tar.zst")]
+    # Archive names start with the backup date, so the newest one sorts last
+    return max(archives, default=None)
 
-def load_from_gcs(file_name):
+
+def load_bundle_from_gcs(file_name, file_obj):
     try:
-        bucket = storage_client.bucket(GCS_BUCKET_NAME)
-        blob = bucket.blob(file_name)
-        data = json.loads(blob.download_as_text())
+        blob = bucket().blob(file_name)
+        blob.download_to_file(file_obj)
+        file_obj.seek(0)
         logging.info(f"Loaded {file_name} from GCS.")
-        return data
     except Exception as e:
-        logging.error(f"Failed to load {file_name} from GCS: {e}")
-        return {}
+        raise Exception(f"Failed to load {file_name} from GCS: {e}")
+
+
+def copy_from_archive(tar, archive_name, names, copied, keep_local=False):
+    """
+    Copies entries of a previous backup archive into the archive being written.
+
+    Args:
+        tar (TarFile): The archive being written.
+        archive_name (str): The GCS name of the previous .tar.zst archive.
+        names (set): The entry names to copy.
+        copied (set): Filled with each entry name as soon as it is copied, so it stays accurate if
+            reading the previous archive fails partway through.
+        keep_local (bool): Also write the copied entries to the local backup folder.
+    """
+    with tempfile.TemporaryFile() as archive_file:
+        load_bundle_from_gcs(archive_name, archive_file)
+
+        decompressor = zstandard.ZstdDecompressor()
+        with decompressor.stream_reader(archive_file, closefd=False) as reader, \
+                tarfile.open(fileobj=reader, mode='r|') as previous:
+            for member in previous:
+                if member.isfile() and member.name in names:
+                    content = orjson.loads(previous.extractfile(member).read())
+                    add_to_bundle(tar, member.name, content)
+                    if keep_local:
+                        save_to_file(member.name, content)
+                    copied.add(member.name)
 
 
 def save_to_file(filename, content):
@@ -167,7 +262,7 @@ def save_to_file(filename, content):
     Create a file with the given JSON content in a folder at the same location as the script.
 
     Args:
-        filename (str): The name of the file to be created.
+        filename (str): The name of the file to be created, relative to the backup folder.
         content (dict): The JSON content to write into the file.
 
     Returns:
@@ -175,17 +270,13 @@ def save_to_file(filename, content):
     """
     try:
 
-        # Create a folder at the script's directory if not present
-        backup_dir = BACKUP_DIRECTORY
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir)
-
-        # Full path to the file
-        file_path = os.path.join(backup_dir, filename)
+        # Full path to the file, creating its folder at the script's directory if not present
+        file_path = os.path.join(BACKUP_DIRECTORY, filename)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
         # Write the JSON content to the file
-        with open(file_path, 'w') as file:
-            json.dump(content, file, indent=4)  # Format JSON with indentation
+        with open(file_path, 'wb') as file:
+            file.write(orjson.dumps(content, option=orjson.OPT_INDENT_2))  # Format JSON with indentation
 
         logging.info(f"File '{file_path}' created successfully.")
     except Exception as e:
@@ -193,133 +284,204 @@ def save_to_file(filename, content):
 
 
 # Backup Application State
-def backup_application_state(headers):
-    namespaces = fetch_namespaces(headers)
+def backup_application_state(kind="apps", keep_local=False):
+    namespaces = fetch_namespaces()
     if not namespaces:
         logging.warning("No namespaces found to backup.")
         return
 
-    file_path = os.path.join(BACKUP_DIRECTORY, "namespaces.json")
-    # save_to_gcs("cdf/namespaces.json", namespaces)
-    save_to_file(file_path, namespaces)
-
-    for namespace in namespaces:
-        namespace_name = namespace["name"]
-        if namespace_name != "default":
-            try:
-
-                logging.info(f"*************Fetching Pipelines from {namespace_name}********************")
-                pipelines_list = fetch_pipelines_list(namespace_name, headers)
-                for pipeline in pipelines_list:
-                    # print(pipeline)
-                    pipeline_name = pipeline.get('name')
-                    # print(pipeline_name)
-                    content = fetch_pipeline(namespace_name, headers, pipeline_name)
-                    pipeline_file_path = os.path.join(BACKUP_DIRECTORY, namespace_name, f"{pipeline_name}.json")
-                    # save_to_gcs(f"cdf/{namespace_name}/pipelines/{pipeline_name}.json", content)
-                    save_to_file(pipeline_file_path, content)
-
-                logging.info(f"***************Fetching Connections from {namespace_name}*****************")
-                connections = fetch_connections(namespace_name, headers)
-                for connection in connections:
-                    connection_name = connection.get('name')
-                    connection_file_path = os.path.join(BACKUP_DIRECTORY, namespace_name, f"{connection_name}.json")
-                    # save_to_gcs(f"cdf/{namespace_name}/connections/{connection_name}.json", connection)
-                    save_to_file(connection_file_path, connection)
-            except Exception as e:
-                logging.error(f"Failed to fetch connections/pipelines for namespace '{namespace_name}': {e.args}")
+    # ETags are only worth sending when the previous archive can supply the unchanged pipelines
+    previous_archive = find_latest_archive(kind)
+    etags = load_etags(kind) if previous_archive else {}
+    updated_etags = {}
 
+    # Fetched JSON goes straight into the archive, the folder copy is only written when asked for
+    archive_filename = f"{TODAY}_{kind}_backup.tar.zst"
+    archive_path = os.path.join(DIRECTORY, archive_filename)
     try:
-        logging.info("***************Compressing and uploading the backup files to GCS******************************")
+        compressor = zstandard.ZstdCompressor(level=ARCHIVE_COMPRESSION_LEVEL, threads=-1)
+        with open(archive_path, 'wb') as f, compressor.stream_writer(f) as writer, \
+                tarfile.open(fileobj=writer, mode='w|') as tar, \
+                ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            add_to_bundle(tar, "namespaces.json", namespaces)
+            if keep_local:
+                save_to_file("namespaces.json", namespaces)
+
+            # List pipelines and connections of every namespace concurrently
+            listings = {}
+            for namespace in namespaces:
+                namespace_name = namespace["name"]
+                if namespace_name != "default":
+                    logging.info(f"*************Fetching Pipelines and Connections from {namespace_name}********************")
+                    listings[namespace_name] = (
+                        executor.submit(fetch_pipelines_list, namespace_name, kind),
+                        executor.submit(fetch_connections, namespace_name),
+                    )
+
+            # Fetch every pipeline concurrently once its namespace listing resolves
+            id_key = PIPELINE_URLS[kind]["id_key"]
+            pipeline_futures = {}
+            pipeline_ids = {}
+            for namespace_name, (pipelines_future, connections_future) in listings.items():
+                try:
+                    for pipeline in pipelines_future.result():
+                        pipeline_name = pipeline.get('name')
+                        pipeline_file_path = f"{namespace_name}/pipelines/{pipeline_name}.json"
+                        pipeline_ids[pipeline_file_path] = (namespace_name, pipeline.get(id_key))
+                        future = executor.submit(fetch_pipeline, namespace_name, pipeline.get(id_key), kind,
+                                                 etags.get(pipeline_file_path))
+                        pipeline_futures[future] = pipeline_file_path
+
+                    for connection in connections_future.result():
+                        connection_name = connection.get('name')
+                        connection_file_path = f"{namespace_name}/connections/{connection_name}.json"
+                        add_to_bundle(tar, connection_file_path, connection)
+                        if keep_local:
+                            save_to_file(connection_file_path, connection)
+                except Exception as e:
+                    logging.error(f"Failed to fetch connections/pipelines for namespace '{namespace_name}': {e.args}")
+
+            # The tar is only written from this thread
+            while pipeline_futures:
+                unchanged = set()
+                for future in as_completed(pipeline_futures):
+                    pipeline_file_path = pipeline_futures[future]
+                    try:
+                        pipeline = future.result()
+                        if not pipeline:
+                            continue
+                        if pipeline["etag"]:
+                            updated_etags[pipeline_file_path] = pipeline["etag"]
+                        if pipeline["unchanged"]:
+                            unchanged.add(pipeline_file_path)
+                            continue
+                        content = pipeline["content"]
+                        add_to_bundle(tar, pipeline_file_path, content)
+                        if keep_local:
+                            save_to_file(pipeline_file_path, content)
+                    except Exception as e:
+                        logging.error(f"Failed to save pipeline '{pipeline_file_path}': {e.args}")
+
+                # Unchanged pipelines come from the previous archive, any it is missing are fetched again in full
+                pipeline_futures = {}
+                if unchanged:
+                    copied = set()
+                    try:
+                        copy_from_archive(tar, previous_archive, unchanged, copied, keep_local)
+                        logging.info(f"Copied {len(copied)} unchanged pipelines from '{previous_archive}'.")
+                    except Exception as e:
+                        logging.error(f"Failed to copy unchanged pipelines from '{previous_archive}': {e}")
+                    for pipeline_file_path in unchanged - copied:
+                        namespace_name, pipeline_id = pipeline_ids[pipeline_file_path]
+                        future = executor.submit(fetch_pipeline, namespace_name, pipeline_id, kind)
+                        pipeline_futures[future] = pipeline_file_path
+
+        logging.info(f"Backup archive saved at: {archive_path}")
+    except Exception as e:
+        logging.error(f"Failed to write backup archive: {e}")
+        return
 
-        compress_folder_and_upload_to_gcs(BACKUP_DIRECTORY, f"{TODAY}_backup.zip")
+    try:
+        logging.info("***************Uploading the backup archive to GCS******************************")
 
+        upload_archive_to_gcs(archive_path, archive_filename)
+        save_to_gcs(ETAG_CACHE.format(kind=kind), updated_etags)
 
     except Exception as e:
-        logging.error(f"Failed to compress and upload backup files to GCS: {e}")
+        logging.error(f"Failed to upload backup archive to GCS: {e}")
 
 
 # Restore Application State
-def restore_application_state(headers):
-    namespaces = load_from_gcs("cdf/namespaces.json")
-    if not namespaces:
-        logging.warning("No namespaces found in backup. Exiting restore process.")
+def restore_pipeline(namespace, pipeline, kind):
+    try:
+        pipeline_name = pipeline["name"]
+        restore_url = PIPELINE_URLS[kind]["restore"]
+        pipeline_id = pipeline[PIPELINE_URLS[kind]["restore_id_key"]]
+        response = session.put(restore_url.format(namespace=namespace, pipeline_id=pipeline_id),
+                               json=pipeline, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        logging.info(f"Pipeline '{pipeline_name}' restored in namespace '{namespace}'.")
+    except Exception as e:
+        logging.error(f"Failed to restore pipeline '{pipeline.get('name')}' in namespace '{namespace}': {e}")
+
+
+def restore_connection(namespace, connection):
+    try:
+        connection_name = connection["name"]
+        response = session.put(CONNECTION_URL.format(namespace=namespace, connection=connection_name),
+                               json=connection, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        logging.info(f"Connection '{connection_name}' restored in namespace '{namespace}'.")
+    except Exception as e:
+        logging.error(f"Failed to restore connection '{connection.get('name')}' in namespace '{namespace}': {e}")
+
+
+def restore_application_state(kind="apps"):
+    archive_name = find_latest_archive(kind)
+    if not archive_name:
+        logging.warning(f"No {kind} backup archive found. Exiting restore process.")
         return
 
-    for namespace in namespaces:
-        name = namespace["name"]
-
-        if name != "default":
-
-            try:
-                # Recreate namespace
-                response = session.put(f"https://{CDAP_BASE_URL}api/v3/namespaces/{name}", json=namespace,
-                                       headers=headers)
-                response.raise_for_status()
-                logging.info(f"Namespace '{name}' recreated successfully.")
-            except requests.exceptions.RequestException as e:
-                logging.error(f"Failed to recreate namespace '{name}': {e}")
-                continue
-
-            # Recreate pipelines
-            try:
-                bucket = storage_client.bucket(GCS_BUCKET_NAME)
-                print("name --> ", name)
-                print("bucket -->", bucket)
-                list_pipeline = bucket.list_blobs(prefix=f"cdf/{name}/pipelines/", delimiter="/")
-                print("list -->", list_pipeline)
-                for blob in list_pipeline:
-                    print("blob --> ", blob.name)
-                    pipeline = load_from_gcs(blob.name)
-                    pipeline_name = pipeline["name"]
-                    # print(pipeline)
-
-                    # for pipeline in pipelines:
-                    response = session.put(
-                        f"https://{CDAP_BASE_URL}api/v3/namespaces/system/apps/pipeline/services/studio/methods/v1/contexts/{name}/drafts/{pipeline_name}",
-                        json=pipeline,
-                        headers=headers)
-                    response.raise_for_status()
-                    logging.info(f"Pipeline '{pipeline['name']}' restored in namespace '{name}'.")
-            except Exception as e:
-                logging.error(f"Failed to restore pipeline '{pipeline['name']}' in namespace '{name}': {e}")
-
-            # Recreate connections
-            try:
-                bucket = storage_client.bucket(GCS_BUCKET_NAME)
-                print("name --> ", name)
-                print("bucket -->", bucket)
-                list_connections = bucket.list_blobs(prefix=f"cdf/{name}/connections/", delimiter="/")
-                print("list -->", list_connections)
-                for blob in list_connections:
-                    print("blob -->", blob)
-                    connection = load_from_gcs(blob.name)
-                    connection_name = connection["name"]
-                    response = session.put(
-                        f"https://{CDAP_BASE_URL}api/v3/namespaces/system/apps/pipeline/services/studio/methods/v1/contexts/{name}/connections/{connection_name}",
-                        json=connection,
-                        headers=headers)
-                    response.raise_for_status()
-                    logging.info(f"Connection '{connection['name']}' restored in namespace '{name}'.")
-            except requests.exceptions.RequestException as e:
-                logging.error(
-                    f"Failed to restore connection '{connection['name']}' in namespace '{name}': {e}")
+    # Stream the archive and restore each pipeline and connection as it is read
+    with tempfile.TemporaryFile() as archive_file, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        load_bundle_from_gcs(archive_name, archive_file)
+
+        restored_namespaces = set()
+        decompressor = zstandard.ZstdDecompressor()
+        with decompressor.stream_reader(archive_file, closefd=False) as reader, \
+                tarfile.open(fileobj=reader, mode='r|') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+
+                content = orjson.loads(tar.extractfile(member).read())
+
+                # namespaces.json is the first member, recreate namespaces before any of their contents
+                if member.name == "namespaces.json":
+                    for namespace in content:
+                        name = namespace["name"]
+                        if name == "default":
+                            continue
+                        try:
+                            response = session.put(NAMESPACE_URL.format(namespace=name), json=namespace,
+                                                   timeout=REQUEST_TIMEOUT)
+                            response.raise_for_status()
+                            restored_namespaces.add(name)
+                            logging.info(f"Namespace '{name}' recreated successfully.")
+                        except requests.exceptions.RequestException as e:
+                            logging.error(f"Failed to recreate namespace '{name}': {e}")
+                    continue
+
+                parts = member.name.split("/")
+                if len(parts) != 3 or parts[0] not in restored_namespaces:
+                    continue
+
+                name, entry_kind, _ = parts
+                logging.debug("Restoring %s", member.name)
+                if entry_kind == "pipelines":
+                    executor.submit(restore_pipeline, name, content, kind)
+                elif entry_kind == "connections":
+                    executor.submit(restore_connection, name, content)
 
 
 # Main Function
 def main():
+    global session
     parser = argparse.ArgumentParser(description="Backup or Restore GCP Data Fusion CDAP Application State.")
     parser.add_argument("operation", choices=["backup", "restore"], help="Specify 'backup' or 'restore'.")
+    parser.add_argument("--kind", choices=list(PIPELINE_URLS), default="apps",
+                        help="Pipelines to back up or restore, deployed 'apps' or Studio 'drafts'.")
+    parser.add_argument("--keep-local", action="store_true", help="Also keep the backed up JSON files in a local folder.")
     args = parser.parse_args()
 
     try:
 
-        access_token = get_access_token()
-        headers = {"Authorization": f"Bearer {access_token}"}
+        session = create_session()
+        client()
         if args.operation == "backup":
-            backup_application_state(headers)
+            backup_application_state(kind=args.kind, keep_local=args.keep_local)
         elif args.operation == "restore":
-            restore_application_state(headers)
+            restore_application_state(kind=args.kind)
     except Exception as e:
         logging.error(f"An unexpected error occurred during -> {args.operation}: {e}")
 